@@ -0,0 +1,136 @@
+"""
+Claude Buddy - Shared Hook Support
+
+Helpers shared by the PreToolUse safety hooks: hooks.json config loading,
+compiled pattern caching, audit log appends, notifications and the
+pre-encoded approve response.
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+from typing import List, Dict, Any, Tuple, Optional, Pattern
+
+# Pre-encoded approve response, written straight to sys.stdout.buffer
+APPROVE_BYTES = b'{"decision":"approve","continue":true,"suppressOutput":true}\n'
+
+def decode_json(data: bytes) -> Any:
+    """Parse a JSON document from raw bytes. Raises ValueError when malformed."""
+    return json.loads(data)
+
+def encode_json(obj: Any) -> bytes:
+    """Serialize a hook response as one UTF-8 line for sys.stdout.buffer."""
+    return json.dumps(obj).encode() + b"\n"
+
+# Flags for the built-in hook patterns: commands and paths are matched with
+# ASCII case folding, which avoids the full Unicode case-folding tables
+PATTERN_FLAGS = re.IGNORECASE | re.ASCII
+
+# Flags for user-configured patterns. These stay Unicode-aware, since adding
+# re.ASCII would make a pattern containing (?u) fail to compile and the hook
+# exit without blocking.
+USER_PATTERN_FLAGS = re.IGNORECASE
+
+# hooks.json locations in lookup order; the project copy wins over the user's.
+# Home is expanded once per process rather than on every load.
+HOOKS_CONFIG_PATHS = (
+    ".claude/hooks.json",
+    os.path.join(os.path.expanduser("~"), ".claude", "hooks.json"),
+)
+
+def load_hooks_config() -> Optional[Dict[str, Any]]:
+    """Return the config section of the first usable hooks.json, or None."""
+    for config_path in HOOKS_CONFIG_PATHS:
+        # Open directly instead of probing first
+        try:
+            with open(config_path, 'rb') as f:
+                hooks_data = decode_json(f.read())
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError):
+            continue  # Unreadable or malformed config, try the next location
+
+        # Extract config section from hooks.json
+        if "config" in hooks_data:
+            return hooks_data["config"]
+
+    return None
+
+# Compiled user-configured patterns, keyed by the pattern strings they came from
+_CONFIG_PATTERN_CACHE: Dict[Tuple[str, ...], List[Pattern]] = {}
+
+def compile_config_patterns(patterns: List[str]) -> List[Pattern]:
+    """Compile user-configured patterns once and reuse them on later calls."""
+    key = tuple(patterns)
+    compiled = _CONFIG_PATTERN_CACHE.get(key)
+    if compiled is None:
+        compiled = [re.compile(pattern, USER_PATTERN_FLAGS) for pattern in key]
+        _CONFIG_PATTERN_CACHE[key] = compiled
+    return compiled
+
+def log_timestamp() -> str:
+    """Current local time in datetime.isoformat() layout, without importing datetime."""
+    seconds, nanoseconds = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))}.{nanoseconds // 1000:06d}"
+
+# Log file descriptors, opened on first use and kept for the life of the process
+_LOG_FDS: Dict[str, int] = {}
+
+def close_log_files():
+    """Close log file descriptors opened by append_log_line."""
+    while _LOG_FDS:
+        _, fd = _LOG_FDS.popitem()
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+def append_log_line(log_file: str, line: bytes):
+    """Append a line to a log file with a single O_APPEND write.
+
+    O_APPEND positions every write at end of file, so writing each line in one
+    call keeps concurrent hook processes from interleaving their lines.
+    """
+    fd = _LOG_FDS.get(log_file)
+    if fd is None:
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        try:
+            fd = os.open(log_file, flags, 0o644)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            fd = os.open(log_file, flags, 0o644)
+        if not _LOG_FDS:
+            atexit.register(close_log_files)
+        _LOG_FDS[log_file] = fd
+    os.write(fd, line)
+
+def send_notification(title: str, message: str, config: Dict[str, Any]):
+    """Send desktop notification if enabled."""
+    notifications_config = config.get("notifications", {})
+
+    # Check if notifications are enabled
+    if not notifications_config.get("desktop_alerts", False):
+        return
+
+    # Check if protection events should trigger notifications
+    if not notifications_config.get("protection_events", True):
+        return
+
+    try:
+        import platform
+        system = platform.system()
+
+        if system == "Darwin":  # macOS
+            # Use osascript for macOS notifications
+            import subprocess
+            script = f'display notification "{message}" with title "{title}"'
+            subprocess.run(["osascript", "-e", script], capture_output=True, timeout=2)
+        elif system == "Linux":
+            # Use notify-send for Linux
+            import subprocess
+            subprocess.run(["notify-send", title, message], capture_output=True, timeout=2)
+        # Windows notifications could be added here if needed
+    except Exception:
+        pass  # Notification failed, but don't block the operation
@@ -10,7 +10,24 @@ import sys
 import json
 import os
 import re
-from typing import List, Dict, Any, Tuple
+import functools
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Pattern, NamedTuple
+
+# Importing the shared module must not leave a __pycache__ directory in the
+# user's project, so no bytecode is written for it
+sys.dont_write_bytecode = True
+
+from _buddy_common import (
+    APPROVE_BYTES,
+    PATTERN_FLAGS,
+    USER_PATTERN_FLAGS,
+    append_log_line,
+    decode_json,
+    encode_json,
+    load_hooks_config,
+    log_timestamp,
+    send_notification,
+)
 
 # Dangerous command patterns that should be blocked
 DANGEROUS_COMMANDS = [
@@ -61,61 +78,143 @@ BEST_PRACTICE_SUGGESTIONS = [
     (r"git\s+push\s+.*--force", "Consider using '--force-with-lease' instead of '--force' for safer pushing"),
 ]
 
+class CompiledTable(NamedTuple):
+    """A pattern table compiled for matching."""
+    screen: Optional[Pattern]  # All patterns joined into one alternation, if joinable
+    entries: List[Tuple[Pattern, str]]  # Per-pattern (regex, message), in table order
+
+    def matches(self, command: str) -> Iterator[str]:
+        """Yield the message of every matching pattern, in table order.
+
+        A miss on the screen means no pattern in the table can match. On a hit
+        the entries are walked in order, which keeps the reported reason
+        first-match-wins and still reports overlapping warnings.
+        """
+        if self.screen is not None and not self.screen.search(command):
+            return
+        for pattern, message in self.entries:
+            if pattern.search(command):
+                yield message
+
+    def first_match(self, command: str) -> Optional[str]:
+        """Return the message of the first matching pattern, or None."""
+        return next(self.matches(command), None)
+
+def compile_table(patterns: List[Tuple[str, str]], flags: int = PATTERN_FLAGS) -> CompiledTable:
+    """Compile a pattern table into a single-pass screen plus its ordered entries."""
+    entries = [(re.compile(pattern, flags), message) for pattern, message in patterns]
+
+    # Joining patterns renumbers capture groups (breaking backreferences) and
+    # rejects inline global flags, so such tables are only walked entry by entry
+    screen = None
+    if entries and not any(regex.groups for regex, _ in entries):
+        try:
+            screen = re.compile("|".join(f"(?:{pattern})" for pattern, _ in patterns), flags)
+        except re.error:
+            pass
+    return CompiledTable(screen, entries)
+
+class DangerTables(NamedTuple):
+    """Compiled whitelist and dangerous tables for one command validation config."""
+    whitelist: CompiledTable
+    dangerous: CompiledTable  # Built-in patterns
+    additional: CompiledTable  # Configured patterns, checked after the built-in ones
+
+@functools.lru_cache(maxsize=None)
+def compile_danger_tables(whitelist_patterns: Tuple[str, ...], additional_patterns: Tuple[str, ...]) -> DangerTables:
+    """Compile the whitelist, the built-in dangerous table and the configured dangerous patterns.
+
+    Configured patterns are compiled with USER_PATTERN_FLAGS and kept in their
+    own tables, so they are never joined with the ASCII-only built-in patterns.
+    """
+    return DangerTables(
+        compile_table([(pattern, "Whitelisted command") for pattern in whitelist_patterns], USER_PATTERN_FLAGS),
+        compile_table(DANGEROUS_COMMANDS),
+        compile_table([(pattern, "Custom dangerous pattern") for pattern in additional_patterns], USER_PATTERN_FLAGS),
+    )
+
+def build_danger_tables(config: Dict[str, Any]) -> DangerTables:
+    """Return the compiled whitelist and dangerous tables for a config, compiling them on first use.
+
+    Results are memoized on the configured pattern lists, so repeated calls and
+    unchanged configs reuse the same compiled objects, and early exits in main()
+    never compile anything.
+    """
+    validation_config = config.get("command_validation", {})
+    return compile_danger_tables(
+        tuple(validation_config.get("whitelist_patterns", [])),
+        tuple(validation_config.get("additional_dangerous_patterns", [])),
+    )
+
+# The warning tables hold built-in patterns only, so they are compiled without
+# reading the config and never depend on user-supplied patterns
+@functools.lru_cache(maxsize=None)
+def compile_performance_table() -> CompiledTable:
+    """Compile the built-in performance warning table on first use."""
+    return compile_table(PERFORMANCE_WARNINGS)
+
+@functools.lru_cache(maxsize=None)
+def compile_best_practice_table() -> CompiledTable:
+    """Compile the built-in best practice table on first use."""
+    return compile_table(BEST_PRACTICE_SUGGESTIONS)
+
+# Configuration used when no hooks.json config is found. load_config() returns
+# this exact object, so checks can recognize it by identity.
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "command_validation": {
+        "enabled": True,
+        "block_dangerous": True,
+        "warn_performance": True,
+        "suggest_best_practices": True,
+        "additional_dangerous_patterns": [],
+        "whitelist_patterns": [],
+        "strict_mode": False,
+        "log_approved": False
+    }
+}
+
 def load_config() -> Dict[str, Any]:
     """Load Claude Buddy configuration for custom command rules."""
-    # Try new location first: .claude/hooks.json
-    hooks_config_paths = [
-        ".claude/hooks.json",
-        os.path.expanduser("~/.claude/hooks.json")
-    ]
-
-    for config_path in hooks_config_paths:
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    hooks_data = json.load(f)
-                    # Extract config section from hooks.json
-                    if "config" in hooks_data:
-                        return hooks_data["config"]
-            except (json.JSONDecodeError, IOError):
-                continue
+    config = load_hooks_config()
+    if config is not None:
+        return config
 
     # Return defaults if no config found
-    return {
-        "command_validation": {
-            "enabled": True,
-            "block_dangerous": True,
-            "warn_performance": True,
-            "suggest_best_practices": True,
-            "additional_dangerous_patterns": [],
-            "whitelist_patterns": [],
-            "strict_mode": False
-        }
-    }
+    return DEFAULT_CONFIG
+
+def check_dangerous_default(command: str) -> Tuple[bool, str]:
+    """check_dangerous_commands() specialized for DEFAULT_CONFIG.
+
+    Blocking is on and there are no whitelist or additional patterns, so the
+    check reduces to the built-in dangerous table.
+    """
+    description = compile_danger_tables((), ()).dangerous.first_match(command)
+    if description is not None:
+        return True, description
+    return False, ""
 
 def check_dangerous_commands(command: str, config: Dict[str, Any]) -> Tuple[bool, str]:
     """Check if command contains dangerous patterns."""
+    if config is DEFAULT_CONFIG:
+        return check_dangerous_default(command)
+
     validation_config = config.get("command_validation", {})
     
     if not validation_config.get("block_dangerous", True):
         return False, ""
     
+    danger_tables = build_danger_tables(config)
+
     # Check whitelist first
-    whitelist_patterns = validation_config.get("whitelist_patterns", [])
-    for pattern in whitelist_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return False, ""  # Whitelisted command
+    if danger_tables.whitelist.first_match(command) is not None:
+        return False, ""  # Whitelisted command
     
-    # Combine default and additional dangerous patterns
-    dangerous_patterns = DANGEROUS_COMMANDS.copy()
-    additional_patterns = validation_config.get("additional_dangerous_patterns", [])
-    for pattern in additional_patterns:
-        dangerous_patterns.append((pattern, "Custom dangerous pattern"))
-    
-    # Check each dangerous pattern
-    for pattern, description in dangerous_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return True, description
+    # Check default and additional dangerous patterns
+    description = danger_tables.dangerous.first_match(command)
+    if description is None:
+        description = danger_tables.additional.first_match(command)
+    if description is not None:
+        return True, description
     
     return False, ""
 
@@ -126,12 +225,7 @@ def check_performance_issues(command: str, config: Dict[str, Any]) -> List[str]:
     if not validation_config.get("warn_performance", True):
         return []
     
-    suggestions = []
-    for pattern, suggestion in PERFORMANCE_WARNINGS:
-        if re.search(pattern, command, re.IGNORECASE):
-            suggestions.append(suggestion)
-    
-    return suggestions
+    return list(compile_performance_table().matches(command))
 
 def check_best_practices(command: str, config: Dict[str, Any]) -> List[str]:
     """Check for best practice violations and return suggestions."""
@@ -140,12 +234,7 @@ def check_best_practices(command: str, config: Dict[str, Any]) -> List[str]:
     if not validation_config.get("suggest_best_practices", True):
         return []
     
-    suggestions = []
-    for pattern, suggestion in BEST_PRACTICE_SUGGESTIONS:
-        if re.search(pattern, command, re.IGNORECASE):
-            suggestions.append(suggestion)
-    
-    return suggestions
+    return list(compile_best_practice_table().matches(command))
 
 def get_safer_alternative(command: str) -> str:
     """Suggest safer alternatives for dangerous commands."""
@@ -207,13 +296,8 @@ def create_warning_response(command: str, warnings: List[str], suggestions: List
         "suppressOutput": False
     }
 
-def create_approve_response() -> Dict[str, Any]:
-    """Create a JSON response to approve the command execution."""
-    return {
-        "decision": "approve",
-        "continue": True,
-        "suppressOutput": True
-    }
+# Closing fields shared by every log line this hook writes
+_LOG_LINE_SUFFIX = b', "tool": "command-validator"}\n'
 
 def log_command_event(command: str, action: str, blocked: bool, warnings: List[str], config: Dict[str, Any]):
     """Log command validation events for audit trail."""
@@ -227,17 +311,9 @@ def log_command_event(command: str, action: str, blocked: bool, warnings: List[s
     if not logging_config.get("command_executions", True):
         return
 
-    log_dir = ".claude/logs"
-    if not os.path.exists(log_dir):
-        try:
-            os.makedirs(log_dir)
-        except OSError:
-            return
-
-    log_file = os.path.join(log_dir, "commands.log")
+    log_file = os.path.join(".claude/logs", "commands.log")
 
-    import datetime
-    timestamp = datetime.datetime.now().isoformat()
+    timestamp = log_timestamp()
 
     log_level = logging_config.get("level", "info")
 
@@ -247,8 +323,7 @@ def log_command_event(command: str, action: str, blocked: bool, warnings: List[s
         "command": command,
         "action": action,
         "blocked": blocked,
-        "warnings": warnings,
-        "tool": "command-validator"
+        "warnings": warnings
     }
 
     # Only log if level is appropriate
@@ -256,46 +331,17 @@ def log_command_event(command: str, action: str, blocked: bool, warnings: List[s
         return  # Only log blocks in error mode
 
     try:
-        with open(log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except IOError:
+        # The constant "tool" field is appended as pre-encoded bytes
+        append_log_line(log_file, json.dumps(log_entry)[:-1].encode() + _LOG_LINE_SUFFIX)
+    except OSError:
         pass
 
-def send_notification(title: str, message: str, config: Dict[str, Any]):
-    """Send desktop notification if enabled."""
-    notifications_config = config.get("notifications", {})
-
-    # Check if notifications are enabled
-    if not notifications_config.get("desktop_alerts", False):
-        return
-
-    # Check if protection events should trigger notifications
-    if not notifications_config.get("protection_events", True):
-        return
-
-    try:
-        import platform
-        system = platform.system()
-
-        if system == "Darwin":  # macOS
-            # Use osascript for macOS notifications
-            import subprocess
-            script = f'display notification "{message}" with title "{title}"'
-            subprocess.run(["osascript", "-e", script], capture_output=True, timeout=2)
-        elif system == "Linux":
-            # Use notify-send for Linux
-            import subprocess
-            subprocess.run(["notify-send", title, message], capture_output=True, timeout=2)
-        # Windows notifications could be added here if needed
-    except Exception:
-        pass  # Notification failed, but don't block the operation
-
 def main():
     """Main hook execution function."""
     try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError as e:
+        # Read JSON input from stdin in one go, bypassing the text layer
+        input_data = decode_json(sys.stdin.buffer.read())
+    except ValueError as e:
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         sys.exit(1)
     
@@ -305,14 +351,14 @@ def main():
     
     # Only process Bash tool
     if tool_name != "Bash":
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Get command being executed
     command = tool_input.get("command", "")
     
     if not command.strip():
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Load configuration
@@ -320,12 +366,12 @@ def main():
 
     # Check if safety hooks feature is enabled (master switch)
     if not config.get("features", {}).get("safety_hooks", True):
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
 
     # Check if command validation is enabled
     if not config.get("command_validation", {}).get("enabled", True):
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Check for dangerous commands
@@ -343,7 +389,7 @@ def main():
         )
 
         response = create_block_response(command, danger_reason, alternative)
-        print(json.dumps(response))
+        sys.stdout.buffer.write(encode_json(response))
         sys.exit(2)  # Exit code 2 indicates blocking
 
     # Check for performance issues and best practice violations
@@ -355,12 +401,13 @@ def main():
     if all_warnings:
         log_command_event(command, "warned", False, all_warnings, config)
         response = create_warning_response(command, performance_warnings, best_practice_suggestions)
-        print(json.dumps(response))
+        sys.stdout.buffer.write(encode_json(response))
         sys.exit(0)
 
-    # Command is safe, log and approve
-    log_command_event(command, "approved", False, [], config)
-    print(json.dumps(create_approve_response()))
+    # Command is safe; clean approvals are only logged when asked for
+    if config.get("command_validation", {}).get("log_approved", False):
+        log_command_event(command, "approved", False, [], config)
+    sys.stdout.buffer.write(APPROVE_BYTES)
     sys.exit(0)
 
 if __name__ == "__main__":
@@ -10,71 +10,108 @@ import sys
 import json
 import os
 import re
-from pathlib import Path
 from typing import List, Dict, Any
 
-# Sensitive file patterns that should be protected
-SENSITIVE_FILE_PATTERNS = [
-    # Environment and secrets
-    r"\.env.*",
-    r".*\.key$",
-    r".*\.pem$", 
-    r".*\.p12$",
-    r".*\.pfx$",
-    r"secrets?\..*",
-    r"credentials?\..*",
-    r".*secret.*",
-    r".*credential.*",
+# Importing the shared module must not leave a __pycache__ directory in the
+# user's project, so no bytecode is written for it
+sys.dont_write_bytecode = True
+
+from _buddy_common import (
+    APPROVE_BYTES,
+    PATTERN_FLAGS,
+    append_log_line,
+    decode_json,
+    encode_json,
+    compile_config_patterns,
+    load_hooks_config,
+    log_timestamp,
+    send_notification,
+)
+
+# Sensitive file patterns that should be protected. They are split by shape so
+# that only the genuinely irregular ones need the regex engine; all checks are
+# case-insensitive and run against the lowercased file name and full path.
+
+# File name suffixes: keys, certificates and databases
+SENSITIVE_EXTENSIONS = (".key", ".pem", ".p12", ".pfx", ".db")
+
+# Substrings that mark a file as sensitive anywhere in its path
+# (also covers "secrets.*" and "credentials.*" names)
+SENSITIVE_SUBSTRINGS = ("secret", "credential", ".sqlite")
+
+# Literal prefixes matched at the start of the file name or of the path
+SENSITIVE_PREFIXES = (
+    # Environment files
+    ".env",
     
     # SSH and crypto
-    r"id_rsa.*",
-    r"id_ed25519.*",
-    r"known_hosts",
-    r"authorized_keys",
-    
-    # Database
-    r".*\.sqlite.*",
-    r".*\.db$",
+    "id_rsa",
+    "id_ed25519",
+    "known_hosts",
+    "authorized_keys",
     
     # Configuration that might contain secrets
-    r"\.aws/.*",
-    r"\.ssh/.*",
-    r"\.docker/config\.json",
-    
+    ".aws/",
+    ".ssh/",
+    ".docker/config.json",
+)
+
+# Remaining patterns matched at the start of the file name or of the path
+SENSITIVE_FILE_PATTERNS = (
     # Common secret file names
     r"api[-_]?keys?\..*",
     r"tokens?\..*",
     r"passwords?\..*",
-]
+)
+
+class _PrefixTrie:
+    """Character trie answering "does any inserted string prefix this text?"."""
+
+    _END = ""  # Marks a node where an inserted string ends
+
+    def __init__(self, words=()):
+        self.root: Dict[str, Any] = {}
+        for word in words:
+            self.insert(word)
+
+    def insert(self, word: str):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[self._END] = True
+
+    def contains_prefix_of(self, text: str) -> bool:
+        """Walk text left to right, stopping at the first dead end."""
+        node = self.root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+_PREFIX_TRIE = _PrefixTrie(SENSITIVE_PREFIXES)
+_SENSITIVE_RE = re.compile("|".join(SENSITIVE_FILE_PATTERNS), PATTERN_FLAGS)
+
+# Tools whose file_path this hook guards
+FILE_WRITE_TOOLS = ("Write", "Edit", "MultiEdit")
 
 # Critical system directories/files to protect
-CRITICAL_PATHS = [
+CRITICAL_PATHS = (
     "/etc/passwd",
-    "/etc/shadow", 
+    "/etc/shadow",
     "/etc/sudoers",
     "/boot/",
     "/sys/",
     "/proc/",
-]
+)
 
 def load_config() -> Dict[str, Any]:
     """Load Claude Buddy configuration for custom protection rules."""
-    # Try new location first: .claude/hooks.json
-    hooks_config_paths = [
-        ".claude/hooks.json",
-        os.path.expanduser("~/.claude/hooks.json")
-    ]
-
-    for config_path in hooks_config_paths:
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    hooks_data = json.load(f)
-                    # Extract config section from hooks.json
-                    if "config" in hooks_data:
-                        return hooks_data["config"]
-            except (json.JSONDecodeError, IOError):
-                continue
+    config = load_hooks_config()
+    if config is not None:
+        return config
 
     # Return defaults if no config found
     return {
@@ -82,40 +119,60 @@ def load_config() -> Dict[str, Any]:
             "enabled": True,
             "additional_patterns": [],
             "whitelist_patterns": [],
-            "strict_mode": False
+            "strict_mode": False,
+            "log_cleared": False
         }
     }
 
+def normalize_path(file_path: str) -> str:
+    """Return os.path.normpath(file_path), skipping the call when it is a no-op.
+
+    On POSIX normpath only rewrites empty paths, "." and ".." components and
+    repeated or trailing slashes, so a path with no leading ".", no trailing
+    "/" and neither "//" nor "/." inside is already normal. Paths that do need
+    it are still collapsed, so "/tmp/../etc/passwd" hits CRITICAL_PATHS.
+    """
+    if os.sep == "/" and file_path and not (
+        file_path[0] == "." or file_path[-1] == "/" or "//" in file_path or "/." in file_path
+    ):
+        return file_path
+    return os.path.normpath(file_path)
+
 def is_sensitive_file(file_path: str, config: Dict[str, Any]) -> bool:
     """Check if a file path matches sensitive file patterns."""
     # Normalize path
-    file_path = os.path.normpath(file_path)
-    file_name = os.path.basename(file_path)
+    file_path = normalize_path(file_path)
+    file_name = file_path.rpartition(os.sep)[2]
     
     # Check against critical system paths
-    for critical_path in CRITICAL_PATHS:
-        if file_path.startswith(critical_path):
-            return True
+    if file_path.startswith(CRITICAL_PATHS):
+        return True
     
     # Get protection config
     protection_config = config.get("file_protection", {})
     
     # Check whitelist first (if file is whitelisted, allow it)
-    whitelist_patterns = protection_config.get("whitelist_patterns", [])
+    whitelist_patterns = compile_config_patterns(protection_config.get("whitelist_patterns", []))
     for pattern in whitelist_patterns:
-        if re.match(pattern, file_path, re.IGNORECASE):
+        if pattern.match(file_path):
             return False
     
     # Check default sensitive patterns
-    all_patterns = SENSITIVE_FILE_PATTERNS.copy()
-    
-    # Add additional patterns from config
-    additional_patterns = protection_config.get("additional_patterns", [])
-    all_patterns.extend(additional_patterns)
+    path_lower = file_path.lower()
+    name_lower = file_name.lower()
+    if name_lower.endswith(SENSITIVE_EXTENSIONS):
+        return True
+    if any(substring in path_lower for substring in SENSITIVE_SUBSTRINGS):
+        return True
+    if _PREFIX_TRIE.contains_prefix_of(name_lower) or _PREFIX_TRIE.contains_prefix_of(path_lower):
+        return True
+    if _SENSITIVE_RE.match(name_lower) or _SENSITIVE_RE.match(path_lower):
+        return True
     
-    # Check each pattern
-    for pattern in all_patterns:
-        if re.match(pattern, file_name, re.IGNORECASE) or re.match(pattern, file_path, re.IGNORECASE):
+    # Check additional patterns from config
+    additional_patterns = compile_config_patterns(protection_config.get("additional_patterns", []))
+    for pattern in additional_patterns:
+        if pattern.match(file_name) or pattern.match(file_path):
             return True
     
     return False
@@ -126,11 +183,11 @@ def get_file_context(file_path: str) -> str:
     
     if ".env" in file_path_lower:
         return "Environment files often contain API keys, database credentials, and other secrets."
-    elif any(ext in file_path_lower for ext in [".key", ".pem", ".p12", ".pfx"]):
+    elif file_path_lower.endswith((".key", ".pem", ".p12", ".pfx")):
         return "Cryptographic key files contain sensitive security credentials."
     elif "secret" in file_path_lower or "credential" in file_path_lower:
         return "Files with 'secret' or 'credential' in the name typically contain sensitive data."
-    elif any(name in file_path_lower for name in ["id_rsa", "id_ed25519"]):
+    elif "id_rsa" in file_path_lower or "id_ed25519" in file_path_lower:
         return "SSH private keys provide authentication access and should be protected."
     elif ".sqlite" in file_path_lower or file_path_lower.endswith(".db"):
         return "Database files may contain sensitive user data and should be handled carefully."
@@ -146,13 +203,8 @@ def create_block_response(file_path: str, reason: str) -> Dict[str, Any]:
         "suppressOutput": False
     }
 
-def create_approve_response() -> Dict[str, Any]:
-    """Create a JSON response to approve the tool execution."""
-    return {
-        "decision": "approve", 
-        "continue": True,
-        "suppressOutput": True
-    }
+# Closing fields shared by every log line this hook writes
+_LOG_LINE_SUFFIX = b', "tool": "file-guard"}\n'
 
 def log_protection_event(file_path: str, action: str, blocked: bool, config: Dict[str, Any]):
     """Log protection events for audit trail."""
@@ -166,17 +218,9 @@ def log_protection_event(file_path: str, action: str, blocked: bool, config: Dic
     if not logging_config.get("file_operations", True):
         return
 
-    log_dir = ".claude/logs"
-    if not os.path.exists(log_dir):
-        try:
-            os.makedirs(log_dir)
-        except OSError:
-            return  # Can't create log directory, skip logging
-
-    log_file = os.path.join(log_dir, "protection.log")
+    log_file = os.path.join(".claude/logs", "protection.log")
 
-    import datetime
-    timestamp = datetime.datetime.now().isoformat()
+    timestamp = log_timestamp()
 
     log_level = logging_config.get("level", "info")
 
@@ -185,8 +229,7 @@ def log_protection_event(file_path: str, action: str, blocked: bool, config: Dic
         "level": "warn" if blocked else "info",
         "file_path": file_path,
         "action": action,
-        "blocked": blocked,
-        "tool": "file-guard"
+        "blocked": blocked
     }
 
     # Only log if level is appropriate
@@ -194,46 +237,17 @@ def log_protection_event(file_path: str, action: str, blocked: bool, config: Dic
         return  # Only log blocks in error mode
 
     try:
-        with open(log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except IOError:
+        # The constant "tool" field is appended as pre-encoded bytes
+        append_log_line(log_file, json.dumps(log_entry)[:-1].encode() + _LOG_LINE_SUFFIX)
+    except OSError:
         pass  # Logging failed, but don't block the operation
 
-def send_notification(title: str, message: str, config: Dict[str, Any]):
-    """Send desktop notification if enabled."""
-    notifications_config = config.get("notifications", {})
-
-    # Check if notifications are enabled
-    if not notifications_config.get("desktop_alerts", False):
-        return
-
-    # Check if protection events should trigger notifications
-    if not notifications_config.get("protection_events", True):
-        return
-
-    try:
-        import platform
-        system = platform.system()
-
-        if system == "Darwin":  # macOS
-            # Use osascript for macOS notifications
-            import subprocess
-            script = f'display notification "{message}" with title "{title}"'
-            subprocess.run(["osascript", "-e", script], capture_output=True, timeout=2)
-        elif system == "Linux":
-            # Use notify-send for Linux
-            import subprocess
-            subprocess.run(["notify-send", title, message], capture_output=True, timeout=2)
-        # Windows notifications could be added here if needed
-    except Exception:
-        pass  # Notification failed, but don't block the operation
-
 def main():
     """Main hook execution function."""
     try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError as e:
+        # Read JSON input from stdin in one go, bypassing the text layer
+        input_data = decode_json(sys.stdin.buffer.read())
+    except ValueError as e:
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         sys.exit(1)
     
@@ -242,9 +256,9 @@ def main():
     tool_input = input_data.get("tool_input", {})
     
     # Only process Write, Edit, and MultiEdit tools
-    if tool_name not in ["Write", "Edit", "MultiEdit"]:
+    if tool_name not in FILE_WRITE_TOOLS:
         # Not a file write operation, allow it
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Get file path being written to
@@ -252,7 +266,7 @@ def main():
     
     if not file_path:
         # No file path specified, allow it
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Load configuration
@@ -260,12 +274,12 @@ def main():
 
     # Check if safety hooks feature is enabled (master switch)
     if not config.get("features", {}).get("safety_hooks", True):
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
 
     # Check if file protection is enabled
     if not config.get("file_protection", {}).get("enabled", True):
-        print(json.dumps(create_approve_response()))
+        sys.stdout.buffer.write(APPROVE_BYTES)
         sys.exit(0)
     
     # Check if this is a sensitive file
@@ -302,12 +316,13 @@ Stay secure! 🔒"""
 
         # Block the operation
         response = create_block_response(file_path, reason)
-        print(json.dumps(response))
+        sys.stdout.buffer.write(encode_json(response))
         sys.exit(2)  # Exit code 2 indicates blocking
 
-    # File is safe to write, log and approve
-    log_protection_event(file_path, tool_name, False, config)
-    print(json.dumps(create_approve_response()))
+    # File is safe to write; clean approvals are only logged when asked for
+    if config.get("file_protection", {}).get("log_cleared", False):
+        log_protection_event(file_path, tool_name, False, config)
+    sys.stdout.buffer.write(APPROVE_BYTES)
     sys.exit(0)
 
 if __name__ == "__main__":
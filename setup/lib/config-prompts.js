@@ -18,7 +18,8 @@ function getDefaultConfig() {
       enabled: true,
       additional_patterns: [],
       whitelist_patterns: [],
-      strict_mode: false
+      strict_mode: false,
+      log_cleared: false
     },
     command_validation: {
       enabled: true,
@@ -27,7 +28,8 @@ function getDefaultConfig() {
       suggest_best_practices: true,
       additional_dangerous_patterns: [],
       whitelist_patterns: [],
-      strict_mode: false
+      strict_mode: false,
+      log_approved: false
     },
     auto_formatting: {
       enabled: true,
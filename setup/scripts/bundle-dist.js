@@ -19,7 +19,8 @@ const EXCLUDE_PATTERNS = [
   'settings.local.json',  // User-specific settings
   'install-metadata.json', // Installation-specific metadata
   '.DS_Store',            // macOS system files
-  'Thumbs.db'             // Windows system files
+  'Thumbs.db',            // Windows system files
+  '__pycache__'           // Python bytecode caches from running hooks locally
 ];
 
 /**
@@ -0,0 +1,113 @@
+/**
+ * Unit Tests: Command Validator Hook
+ * Runs .claude/hooks/command-validator.py against user-configured patterns
+ */
+
+const { spawnSync } = require('child_process');
+const fs = require('fs-extra');
+const path = require('path');
+const { createTempDir, cleanupTempDir } = require('../helpers/test-utils');
+
+const HOOK_PATH = path.join(__dirname, '../../../.claude/hooks/command-validator.py');
+const PYTHON = process.platform === 'win32' ? 'python' : 'python3';
+
+describe('Command Validator Hook', () => {
+  let projectDir;
+
+  beforeEach(async () => {
+    projectDir = await createTempDir();
+  });
+
+  afterEach(async () => {
+    await cleanupTempDir(projectDir);
+  });
+
+  /**
+   * Run the hook on a Bash command with the given command_validation config
+   * @param {string} command - Command passed to the Bash tool
+   * @param {Object} commandValidation - command_validation section of hooks.json
+   * @returns {{status: number, decision: string, stderr: string}}
+   */
+  async function runHook(command, commandValidation) {
+    await fs.outputJson(path.join(projectDir, '.claude', 'hooks.json'), {
+      config: {
+        command_validation: commandValidation,
+        logging: { enabled: false }
+      }
+    });
+
+    const result = spawnSync(PYTHON, [HOOK_PATH], {
+      cwd: projectDir,
+      input: JSON.stringify({ tool_name: 'Bash', tool_input: { command } }),
+      encoding: 'utf-8',
+      timeout: 10000
+    });
+
+    return {
+      status: result.status,
+      decision: result.stdout ? JSON.parse(result.stdout).decision : undefined,
+      stderr: result.stderr
+    };
+  }
+
+  describe('additional_dangerous_patterns', () => {
+    test.each([
+      ['hex escape', 'rm\\x20-rf', 'rm -rf build'],
+      ['unicode escape', 'curl\\u0020evil', 'curl evil.sh'],
+      ['octal escape', '\\101pt-get purge', 'apt-get purge vim'],
+      ['null escape', 'printf\\0', 'printf\0'],
+      ['named escape', 'chown\\N{SPACE}-R', 'chown -R me .'],
+      ['backreference', '(["\'])secret\\1', 'echo "secret"']
+    ])('should block a pattern using a %s', async (_, pattern, command) => {
+      const result = await runHook(command, {
+        additional_dangerous_patterns: [pattern]
+      });
+
+      expect(result.status).toBe(2);
+      expect(result.decision).toBe('block');
+    });
+  });
+
+  describe('whitelist_patterns', () => {
+    test('should approve a whitelisted command matched through a hex escape', async () => {
+      const result = await runHook('rm -rf /tmp/build', {
+        whitelist_patterns: ['rm\\x20-rf\\s+/tmp/']
+      });
+
+      expect(result.status).toBe(0);
+      expect(result.decision).toBe('approve');
+    });
+
+    test('should keep blocking when a whitelist pattern sets inline Unicode flags', async () => {
+      const result = await runHook('rm -rf /', {
+        whitelist_patterns: ['(?u)^echo\\b']
+      });
+
+      expect(result.status).toBe(2);
+      expect(result.decision).toBe('block');
+    });
+
+    test('should still block commands the whitelist does not cover', async () => {
+      const result = await runHook('rm -rf /', {
+        whitelist_patterns: ['rm\\x20-rf\\s+/tmp/']
+      });
+
+      expect(result.status).toBe(2);
+      expect(result.decision).toBe('block');
+    });
+  });
+
+  describe('block_dangerous disabled', () => {
+    test('should not compile user patterns when blocking is off', async () => {
+      const result = await runHook('ls', {
+        block_dangerous: false,
+        additional_dangerous_patterns: ['rm ('],
+        whitelist_patterns: ['(']
+      });
+
+      expect(result.status).toBe(0);
+      expect(result.decision).toBe('approve');
+      expect(result.stderr).toBe('');
+    });
+  });
+});